@@ -3,21 +3,49 @@ import os
 import sys
 import json
 import librosa
+import numba
 import numpy as np
-import matplotlib.pyplot as plt
-from pydub import AudioSegment
+from matplotlib import colormaps
+from PIL import Image
+import soundfile as sf
 from scipy.ndimage import zoom
+from scipy.signal import get_window, lfilter
 import tempfile
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import argparse
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
 import logging
-import traceback
 import shutil
 
 import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tensorflow.keras.utils import load_img, img_to_array
 
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+try:
+    import pyfftw
+    from pyfftw.interfaces.numpy_fft import rfft
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    PYFFTW_AVAILABLE = True
+except ImportError:
+    from numpy.fft import rfft
+    PYFFTW_AVAILABLE = False
+
+try:
+    import torch
+    import torchlibrosa
+    TORCHLIBROSA_AVAILABLE = True
+except ImportError:
+    TORCHLIBROSA_AVAILABLE = False
+
 try:
     import tflite_runtime.interpreter as tflite
     TFLITE_AVAILABLE = True
@@ -29,13 +57,33 @@ except ImportError:
         TFLITE_AVAILABLE = False
         print("Warning: TensorFlow Lite not available, falling back to Keras")
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SPECTROGRAM_CMAP = (colormaps['magma'](np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+
+@numba.njit(cache=True, fastmath=True)
+def fused_colormap(spectrogram: np.ndarray, cmap_u8: np.ndarray, out_u8: np.ndarray) -> np.ndarray:
+    
+    height, width = spectrogram.shape
+    spectrogram_min = spectrogram.min()
+    scale = 255.0 / (spectrogram.max() - spectrogram_min + 1e-9)
+    
+    for i in range(height):
+        row = out_u8[height - 1 - i]
+        for j in range(width):
+            value = min(max((spectrogram[i, j] - spectrogram_min) * scale, 0.0), 255.0)
+            color = cmap_u8[np.uint8(value)]
+            row[j, 0] = color[0]
+            row[j, 1] = color[1]
+            row[j, 2] = color[2]
+    
+    return out_u8
+
 class AudioProcessor:
     
     def __init__(self, segment_duration: float = 3.0, target_size: Tuple[int, int] = (128, 128), 
-                 overlap_ratio: float = 0.5, min_segment_duration: float = 1.0):
+                 overlap_ratio: float = 0.5, min_segment_duration: float = 1.0,
+                 spectrogram_dir: Optional[str] = None):
         
         try:
 
@@ -56,27 +104,38 @@ class AudioProcessor:
             self.target_size = target_size
             self.overlap_ratio = overlap_ratio
             self.min_segment_duration = min_segment_duration
+            self.spectrogram_dir = spectrogram_dir
             self.temp_dir = None
+            self._torch_mel = None
+            self._torch_device = None
+            self._mel_fb = librosa.filters.mel(sr=22050, n_fft=2048, n_mels=128, fmin=50, fmax=11025).astype(np.float32)
+            self._preemph_b = np.array([1.0, -0.97], dtype=np.float32)
+            self._preemph_a = np.array([1.0], dtype=np.float32)
+            self._stft_window = get_window('hann', 2048, fftbins=True).astype(np.float32)
+            
+            num_frames = 1 + int(segment_duration * 22050) // 512
+            self._frames_buf = np.empty((num_frames, 2048), dtype=np.float32)
+            self._mel_buf = np.empty((128, num_frames), dtype=np.float32)
+            self._resized_buf = np.empty(target_size, dtype=np.float32)
             
         except ValueError as e:
-            logger.error(f"Invalid AudioProcessor parameters: {e}")
+            logger.error("Invalid AudioProcessor parameters: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error initializing AudioProcessor: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Unexpected error initializing AudioProcessor: %s", e)
             raise
         
     def __enter__(self):
         
         try:
             self.temp_dir = tempfile.mkdtemp()
-            logger.info(f"Created temporary directory: {self.temp_dir}")
+            logger.info("Created temporary directory: %s", self.temp_dir)
             return self
         except (OSError, PermissionError) as e:
-            logger.error(f"Failed to create temporary directory: {e}")
+            logger.error("Failed to create temporary directory: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error creating temp directory: {e}")
+            logger.error("Unexpected error creating temp directory: %s", e)
             raise
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -84,11 +143,11 @@ class AudioProcessor:
         if self.temp_dir and os.path.exists(self.temp_dir):
             try:
                 shutil.rmtree(self.temp_dir)
-                logger.info(f"Cleaned up temporary directory: {self.temp_dir}")
+                logger.info("Cleaned up temporary directory: %s", self.temp_dir)
             except (OSError, PermissionError) as e:
-                logger.warning(f"Failed to clean up temporary directory {self.temp_dir}: {e}")
+                logger.warning("Failed to clean up temporary directory %s: %s", self.temp_dir, e)
             except Exception as e:
-                logger.warning(f"Unexpected error cleaning up temp directory: {e}")
+                logger.warning("Unexpected error cleaning up temp directory: %s", e)
     
     def extend_audio_to_duration(self, input_file: str, output_file: str, duration_ms: int) -> None:
         
@@ -106,24 +165,24 @@ class AudioProcessor:
             raise PermissionError(f"Cannot read input file: {input_file}")
         
         try:
-            audio = AudioSegment.from_file(input_file)
+            audio, sr = self._load_audio(input_file, sr=None, mono=False)
         except Exception as e:
-            logger.error(f"Failed to load audio file {input_file}: {e}")
+            logger.error("Failed to load audio file %s: %s", input_file, e)
             raise
         
-        if len(audio) > duration_ms:
-            num_segments = (len(audio) + duration_ms - 1) // duration_ms
+        duration_samples = duration_ms * sr // 1000
+        
+        if len(audio) > duration_samples:
+            num_segments = (len(audio) + duration_samples - 1) // duration_samples
             
             for i in range(num_segments):
 
-                start_ms = i * duration_ms
-                end_ms = min((i + 1) * duration_ms, len(audio))
-                segment = audio[start_ms:end_ms]
+                start = i * duration_samples
+                segment = audio[start:start + duration_samples]
                 
-                if len(segment) < duration_ms:
-                    silence_needed = duration_ms - len(segment)
-                    silence = AudioSegment.silent(duration=silence_needed)
-                    segment = segment + silence
+                if len(segment) < duration_samples:
+                    silence = np.zeros((duration_samples - len(segment), audio.shape[1]), dtype=np.float32)
+                    segment = np.concatenate([segment, silence])
                 
                 if i == 0:
                     segment_output = output_file
@@ -138,25 +197,25 @@ class AudioProcessor:
                     if output_dir and not os.path.exists(output_dir):
                         os.makedirs(output_dir, exist_ok=True)
                     
-                    segment.export(segment_output, format="wav")
-                    logger.info(f"Audio segment saved as '{segment_output}' with length {len(segment) / 1000:.2f} seconds.")
+                    sf.write(segment_output, segment, sr, subtype='PCM_16')
+                    logger.info("Audio segment saved as '%s' with length %.2f seconds.", segment_output, len(segment) / sr)
                 except (OSError, PermissionError) as e:
-                    logger.error(f"Failed to export segment to {segment_output}: {e}")
+                    logger.error("Failed to export segment to %s: %s", segment_output, e)
                     raise
                 except Exception as e:
-                    logger.error(f"Unexpected error exporting segment: {e}")
+                    logger.error("Unexpected error exporting segment: %s", e)
                     raise
         else:
 
-            total_silence_needed = max(duration_ms - len(audio), 0)
+            total_silence_needed = max(duration_samples - len(audio), 0)
             
             try:
-                silence_start = AudioSegment.silent(duration=total_silence_needed // 2)
-                silence_end = AudioSegment.silent(duration=total_silence_needed - (total_silence_needed // 2))
+                silence_start = np.zeros((total_silence_needed // 2, audio.shape[1]), dtype=np.float32)
+                silence_end = np.zeros((total_silence_needed - (total_silence_needed // 2), audio.shape[1]), dtype=np.float32)
                 
-                extended_audio = silence_start + audio + silence_end
+                extended_audio = np.concatenate([silence_start, audio, silence_end])
             except Exception as e:
-                logger.error(f"Failed to create extended audio: {e}")
+                logger.error("Failed to create extended audio: %s", e)
                 raise
             
             try:
@@ -165,16 +224,35 @@ class AudioProcessor:
                 if output_dir and not os.path.exists(output_dir):
                     os.makedirs(output_dir, exist_ok=True)
                 
-                extended_audio.export(output_file, format="wav")
-                logger.info(f"Audio saved as '{output_file}' with length {len(extended_audio) / 1000:.2f} seconds.")
+                sf.write(output_file, extended_audio, sr, subtype='PCM_16')
+                logger.info("Audio saved as '%s' with length %.2f seconds.", output_file, len(extended_audio) / sr)
             except (OSError, PermissionError) as e:
-                logger.error(f"Failed to export audio to {output_file}: {e}")
+                logger.error("Failed to export audio to %s: %s", output_file, e)
                 raise
             except Exception as e:
-                logger.error(f"Unexpected error exporting audio: {e}")
+                logger.error("Unexpected error exporting audio: %s", e)
                 raise
     
-    def resize_spectrogram(self, spectrogram: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
+    def _load_audio(self, path: str, sr: Optional[int] = 22050, mono: bool = True) -> Tuple[np.ndarray, int]:
+        
+        try:
+            y, file_sr = sf.read(path, dtype='float32', always_2d=True)
+        except Exception as e:
+            logger.debug("soundfile cannot decode %s (%s), falling back to librosa", path, e)
+            y, file_sr = librosa.load(path, sr=None, mono=False)
+            y = np.atleast_2d(y).T
+        
+        if mono:
+            y = y.mean(axis=1)
+        
+        if sr is not None and file_sr != sr:
+            y = librosa.resample(y, orig_sr=file_sr, target_sr=sr, axis=0)
+            file_sr = sr
+        
+        return y.astype(np.float32, copy=False), file_sr
+    
+    def resize_spectrogram(self, spectrogram: np.ndarray, target_size: Tuple[int, int],
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
         
         if not isinstance(spectrogram, np.ndarray):
             raise ValueError(f"spectrogram must be a numpy array, got {type(spectrogram)}")
@@ -195,16 +273,19 @@ class AudioProcessor:
             if height_scale <= 0 or width_scale <= 0:
                 raise ValueError(f"Invalid scaling factors: height={height_scale}, width={width_scale}")
             
+            if CV2_AVAILABLE:
+                return cv2.resize(spectrogram.astype(np.float32, copy=False), (target_size[1], target_size[0]),
+                                  dst=out, interpolation=cv2.INTER_LINEAR)
+            
             resized_spectrogram = zoom(spectrogram, (height_scale, width_scale), order=1)
             
             return resized_spectrogram[:target_size[0], :target_size[1]]
             
         except (ValueError, ZeroDivisionError) as e:
-            logger.error(f"Error resizing spectrogram: {e}")
+            logger.error("Error resizing spectrogram: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error resizing spectrogram: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Unexpected error resizing spectrogram: %s", e)
             raise
     
     def generate_mel_spectrogram(self, audio_path: str, target_size: Tuple[int, int] = None) -> np.ndarray:
@@ -215,18 +296,15 @@ class AudioProcessor:
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
-        if target_size is None:
-            target_size = self.target_size
-        
         try:
-            y, sr = librosa.load(audio_path, sr=22050, duration=self.segment_duration)
+            y, sr = librosa.load(audio_path, sr=22050, duration=self.segment_duration, dtype=np.float32)
         except Exception as e:
 
             error_str = str(e).lower()
             if 'backend' in error_str or 'no decoder' in error_str or 'could not find' in error_str:
-                logger.error(f"No audio backend available for {audio_path}: {e}")
+                logger.error("No audio backend available for %s: %s", audio_path, e)
             else:
-                logger.error(f"Error loading audio file {audio_path}: {e}")
+                logger.error("Error loading audio file %s: %s", audio_path, e)
             raise
         
         if y is None or len(y) == 0:
@@ -235,42 +313,88 @@ class AudioProcessor:
         if sr is None or sr <= 0:
             raise ValueError(f"Invalid sample rate ({sr}) for {audio_path}")
         
+        return self._mel_from_array(y, sr, target_size)
+    
+    def _preemphasize(self, y: np.ndarray) -> np.ndarray:
+        
         try:
-            y = librosa.effects.preemphasis(y)
+            y, _ = lfilter(self._preemph_b, self._preemph_a, y, zi=2 * y[:1] - y[1:2])
         except Exception as e:
-            logger.warning(f"Error applying pre-emphasis filter: {e}, continuing without it")
+            logger.warning("Error applying pre-emphasis filter: %s, continuing without it", e)
+        
+        return y.astype(np.float32, copy=False)
+    
+    def _stft_power(self, y: np.ndarray) -> np.ndarray:
+        
+        padded = np.pad(y, 1024)
+        frames = np.lib.stride_tricks.sliding_window_view(padded, 2048)[::512]
+        frames_buf = self._frames_buf if frames.shape == self._frames_buf.shape else None
+        frames = np.multiply(frames, self._stft_window, out=frames_buf)
+        spectrum = rfft(frames, axis=-1)
+        
+        power_spectrogram = np.square(spectrum.real, dtype=np.float32)
+        power_spectrogram += np.square(spectrum.imag, dtype=np.float32)
+        
+        return power_spectrogram.T
+    
+    def _mel_from_array(self, y: np.ndarray, sr: int, target_size: Tuple[int, int] = None,
+                        preemphasize: bool = True) -> np.ndarray:
+        
+        if target_size is None:
+            target_size = self.target_size
+        
+        y = np.asarray(y, dtype=np.float32)
+        
+        if preemphasize:
+            y = self._preemphasize(y)
 
+        if sr == 22050:
+            mel_fb = self._mel_fb
+        else:
+            mel_fb = librosa.filters.mel(sr=sr, n_fft=2048, n_mels=128, fmin=50, fmax=sr//2).astype(np.float32)
+        
         try:
-            mel_spectrogram = librosa.feature.melspectrogram(
-                y=y, 
-                sr=sr,
-                n_mels=128,
-                n_fft=2048,
-                hop_length=512,
-                fmin=50,
-                fmax=sr//2,
-                window='hann'
-            )
+            power_spectrogram = self._stft_power(y)
+            mel_buf = self._mel_buf if power_spectrogram.shape[1] == self._mel_buf.shape[1] else None
+            mel_spectrogram = np.matmul(mel_fb, power_spectrogram, out=mel_buf)
         except Exception as e:
-            logger.error(f"Error generating mel spectrogram from {audio_path}: {e}")
+            logger.error("Error generating mel spectrogram: %s", e)
             raise
         
         if mel_spectrogram is None or mel_spectrogram.size == 0:
-            raise ValueError(f"Invalid spectrogram generated for {audio_path}")
+            raise ValueError("Invalid spectrogram generated")
         
         try:
-            mel_spectrogram_db = librosa.power_to_db(mel_spectrogram, ref=np.max, top_db=80)
+            mel_spectrogram_db = np.maximum(mel_spectrogram, 1e-10, out=mel_spectrogram)
+            np.log10(mel_spectrogram_db, out=mel_spectrogram_db)
+            mel_spectrogram_db *= 10.0
+            mel_spectrogram_db -= mel_spectrogram_db.max()
+            np.maximum(mel_spectrogram_db, -80.0, out=mel_spectrogram_db)
         except Exception as e:
-            logger.error(f"Error converting to dB scale: {e}")
+            logger.error("Error converting to dB scale: %s", e)
             raise
         
         try:
-            resized_spectrogram = self.resize_spectrogram(mel_spectrogram_db, target_size)
+            resized_buf = self._resized_buf if tuple(target_size) == self._resized_buf.shape else None
+            resized_spectrogram = self.resize_spectrogram(mel_spectrogram_db, target_size, out=resized_buf)
         except Exception as e:
-            logger.error(f"Error resizing spectrogram: {e}")
+            logger.error("Error resizing spectrogram: %s", e)
             raise
         
-        return resized_spectrogram
+        return self.normalize_spectrogram(resized_spectrogram)
+    
+    def normalize_spectrogram(self, spectrogram: np.ndarray) -> np.ndarray:
+        
+        if not isinstance(spectrogram, np.ndarray) or spectrogram.ndim != 2:
+            raise ValueError(f"spectrogram must be a 2D numpy array, got {type(spectrogram)}")
+        
+        spectrogram = spectrogram.astype(np.float32)
+        spectrogram -= spectrogram.min()
+        value_range = spectrogram.max()
+        if value_range > 0:
+            spectrogram /= value_range
+        
+        return np.repeat(spectrogram[..., np.newaxis], 3, axis=-1)
     
     def save_spectrogram_as_image(self, spectrogram: np.ndarray, output_path: str) -> None:
         
@@ -279,7 +403,6 @@ class AudioProcessor:
         if not isinstance(output_path, str) or not output_path:
             raise ValueError(f"Invalid output_path: {output_path}")
         
-        fig = None
         try:
 
             output_dir = os.path.dirname(output_path)
@@ -287,35 +410,126 @@ class AudioProcessor:
                 try:
                     os.makedirs(output_dir, exist_ok=True)
                 except (OSError, PermissionError) as e:
-                    logger.error(f"Cannot create output directory {output_dir}: {e}")
+                    logger.error("Cannot create output directory %s: %s", output_dir, e)
                     raise
             
             if output_dir and not os.access(output_dir, os.W_OK):
                 raise PermissionError(f"Cannot write to directory: {output_dir}")
             
-            fig = plt.figure(figsize=(8, 8))
-            librosa.display.specshow(spectrogram)
-            plt.axis('off')
-            plt.tight_layout()
+            if spectrogram.ndim == 3:
+                spectrogram = spectrogram[..., 0]
+            
+            rgb = np.empty((*spectrogram.shape, 3), dtype=np.uint8)
+            fused_colormap(np.ascontiguousarray(spectrogram, dtype=np.float32), SPECTROGRAM_CMAP, rgb)
             
             try:
-                plt.savefig(output_path, bbox_inches='tight', pad_inches=0, dpi=100)
-                logger.info(f"Spectrogram saved as image: {output_path}")
+                Image.fromarray(rgb).save(output_path, 'PNG', compress_level=1)
+                logger.info("Spectrogram saved as image: %s", output_path)
             except (IOError, OSError, PermissionError) as e:
-                logger.error(f"Failed to save image to {output_path}: {e}")
+                logger.error("Failed to save image to %s: %s", output_path, e)
                 raise
-            finally:
-                if fig is not None:
-                    plt.close(fig)
-                    fig = None
                     
         except Exception as e:
-            if fig is not None:
-                plt.close(fig)
-            logger.error(f"Error saving spectrogram image: {e}")
+            logger.error("Error saving spectrogram image: %s", e)
             raise
     
-    def segment_audio_file(self, input_file: str) -> List[str]:
+
+    def _slice_segments(self, y: np.ndarray, sr: int) -> List[Tuple[int, int, np.ndarray]]:
+        
+        segment_samples = int(self.segment_duration * sr)
+        min_segment_samples = int(self.min_segment_duration * sr)
+        step_samples = int(segment_samples * (1 - self.overlap_ratio))
+        
+        if len(y) <= segment_samples:
+
+            if len(y) < min_segment_samples:
+                logger.info("Audio too short, padding to minimum duration")
+                y = np.pad(y, (0, min_segment_samples - len(y)))
+            
+            num_segments = 1
+        else:
+
+            num_segments = max(1, (len(y) - segment_samples) // step_samples + 1)
+        
+        logger.info("Creating %s overlapping segments of %s seconds each", num_segments, self.segment_duration)
+        logger.info("Overlap ratio: %.1f%%, Step size: %sms", self.overlap_ratio * 100, step_samples * 1000 // sr)
+        
+        segments = []
+        for i in range(num_segments):
+            start = i * step_samples
+            segment = y[start:start + segment_samples]
+            
+            if len(segment) < min_segment_samples:
+                logger.info("Segment %s too short (%sms), padding to minimum duration", i+1, len(segment) * 1000 // sr)
+                segment = np.pad(segment, (0, min_segment_samples - len(segment)))
+            elif len(segment) < segment_samples and len(segment) >= segment_samples * 0.8:
+                segment = np.pad(segment, (0, segment_samples - len(segment)))
+            
+            segments.append((i, start * 1000 // sr, segment))
+        
+        return segments
+    
+    def _get_torch_mel_extractor(self, sr: int):
+        
+        if self._torch_mel is None:
+            self._torch_device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            self._torch_mel = torch.nn.Sequential(
+                torchlibrosa.Spectrogram(n_fft=2048, hop_length=512, window='hann',
+                                         center=True, pad_mode='constant', power=2.0),
+                torchlibrosa.LogmelFilterBank(sr=sr, n_fft=2048, n_mels=128, fmin=50, fmax=sr // 2,
+                                              is_log=True, ref=1.0, amin=1e-10, top_db=None)
+            ).to(self._torch_device).eval()
+            logger.info("Initialized batched mel spectrogram extractor on %s", self._torch_device)
+        
+        return self._torch_mel
+    
+    def _mel_spectrogram_batch(self, segments: List[np.ndarray], sr: int) -> List[np.ndarray]:
+        
+        extractor = self._get_torch_mel_extractor(sr)
+        
+        spectrograms = [None] * len(segments)
+        lengths = {}
+        for i, segment in enumerate(segments):
+            lengths.setdefault(len(segment), []).append(i)
+        
+        for indices in lengths.values():
+            batch = np.stack([segments[i] for i in indices]).astype(np.float32, copy=False)
+            
+            with torch.no_grad():
+                mel_db = extractor(torch.from_numpy(batch).to(self._torch_device))
+            mel_db = mel_db[:, 0].cpu().numpy()
+            
+            for i, segment_db in zip(indices, mel_db):
+                segment_db = segment_db.T - segment_db.max()
+                np.maximum(segment_db, -80.0, out=segment_db)
+                spectrograms[i] = self.normalize_spectrogram(
+                    self.resize_spectrogram(segment_db, self.target_size))
+        
+        return spectrograms
+    
+    def segment_audio_samples(self, input_file: str) -> List[np.ndarray]:
+        
+        if not isinstance(input_file, str) or not input_file:
+            raise ValueError(f"Invalid input_file: {input_file}")
+        
+        if not os.path.exists(input_file):
+            raise FileNotFoundError(f"Input file not found: {input_file}")
+        
+        try:
+            y, sr = self._load_audio(input_file)
+        except Exception as e:
+            logger.error("Failed to load audio file %s: %s", input_file, e)
+            raise
+        
+        if len(y) == 0:
+            raise ValueError(f"Audio file is empty: {input_file}")
+        
+        segment_samples = int(self.segment_duration * sr)
+        
+        return [np.pad(segment, (0, segment_samples - len(segment)))
+                for _, _, segment in self._slice_segments(y, sr)]
+    
+    def _load_segments(self, input_file: str) -> Tuple[List[Tuple[int, int, np.ndarray]], int]:
         
         if not isinstance(input_file, str) or not input_file:
             raise ValueError(f"Invalid input_file: {input_file}")
@@ -329,115 +543,142 @@ class AudioProcessor:
         if self.temp_dir is None:
             raise RuntimeError("temp_dir not initialized. Use AudioProcessor as context manager.")
         
-        logger.info(f"Processing audio file: {input_file}")
+        logger.info("Processing audio file: %s", input_file)
         
         try:
-            audio = AudioSegment.from_file(input_file)
+            y, sr = self._load_audio(input_file)
         except Exception as e:
-            logger.error(f"Failed to load audio file {input_file}: {e}")
+            logger.error("Failed to load audio file %s: %s", input_file, e)
             raise
         
-        if len(audio) == 0:
+        if len(y) == 0:
             raise ValueError(f"Audio file is empty: {input_file}")
         
-        duration_ms = len(audio)
-        segment_duration_ms = int(self.segment_duration * 1000)
-        min_segment_duration_ms = int(self.min_segment_duration * 1000)
+        logger.info("Audio duration: %.2f seconds", len(y) / sr)
         
-        logger.info(f"Audio duration: {duration_ms / 1000:.2f} seconds")
+        return self._slice_segments(self._preemphasize(y), sr), sr
+    
+    def _finish_segment(self, i: int, start_ms: int, segment: np.ndarray, sr: int,
+                        num_segments: int, spectrogram: np.ndarray) -> None:
         
-        spectrogram_paths = []
+        if self.spectrogram_dir:
+            spectrogram_path = os.path.join(self.spectrogram_dir, f"spectrogram_{i+1}.png")
+            try:
+                self.save_spectrogram_as_image(spectrogram, spectrogram_path)
+            except Exception as e:
+                logger.warning("Failed to save spectrogram image for segment %s: %s", i+1, e)
         
-        step_size_ms = int(segment_duration_ms * (1 - self.overlap_ratio))
+        logger.info("Created segment %s/%s (start: %sms, duration: %sms)", i+1, num_segments, start_ms, len(segment) * 1000 // sr)
+    
+    def _generate_spectrograms(self, segments: List[Tuple[int, int, np.ndarray]], sr: int,
+                               batch_size: int) -> Iterator[Optional[np.ndarray]]:
         
-        if duration_ms <= segment_duration_ms:
-
-            if duration_ms < min_segment_duration_ms:
-                logger.info("Audio too short, padding to minimum duration")
-                silence_needed = min_segment_duration_ms - duration_ms
-                silence = AudioSegment.silent(duration=silence_needed)
-                audio = audio + silence
-                duration_ms = len(audio)
-            
-            num_segments = 1
-        else:
-
-            num_segments = max(1, int((duration_ms - segment_duration_ms) / step_size_ms) + 1)
+        if TORCHLIBROSA_AVAILABLE:
+            return (spectrogram for offset in range(0, len(segments), batch_size)
+                    for spectrogram in self._mel_spectrogram_batch(
+                        [segment for _, _, segment in segments[offset:offset + batch_size]], sr))
         
-        logger.info(f"Creating {num_segments} overlapping segments of {self.segment_duration} seconds each")
-        logger.info(f"Overlap ratio: {self.overlap_ratio:.1%}, Step size: {step_size_ms}ms")
+        tasks = [(i, segment, sr) for i, _, segment in segments]
+        if len(tasks) < 2:
+            return (_process_segment(task, self) for task in tasks)
         
-        for i in range(num_segments):
-            try:
-
-                start_ms = i * step_size_ms
-                end_ms = min(start_ms + segment_duration_ms, duration_ms)
-                segment = audio[start_ms:end_ms]
-                
-                if len(segment) < min_segment_duration_ms:
-                    logger.info(f"Segment {i+1} too short ({len(segment)}ms), padding to minimum duration")
-                    silence_needed = min_segment_duration_ms - len(segment)
-                    silence = AudioSegment.silent(duration=silence_needed)
-                    segment = segment + silence
-                elif len(segment) < segment_duration_ms:
-
-                    if len(segment) >= segment_duration_ms * 0.8:
-                        silence_needed = segment_duration_ms - len(segment)
-                        silence = AudioSegment.silent(duration=silence_needed)
-                        segment = segment + silence
-                
-                segment_path = os.path.join(self.temp_dir, f"segment_{i+1}.wav")
-                try:
-                    segment.export(segment_path, format="wav")
-                except Exception as e:
-                    logger.error(f"Failed to export segment {i+1} to {segment_path}: {e}")
-                    continue
-                
-                try:
-                    spectrogram = self.generate_mel_spectrogram(segment_path)
-                except Exception as e:
-                    logger.error(f"Failed to generate spectrogram for segment {i+1}: {e}")
-                    continue
-                
-                spectrogram_path = os.path.join(self.temp_dir, f"spectrogram_{i+1}.png")
-                try:
-                    self.save_spectrogram_as_image(spectrogram, spectrogram_path)
-                except Exception as e:
-                    logger.error(f"Failed to save spectrogram image for segment {i+1}: {e}")
-                    continue
-                
-                spectrogram_paths.append(spectrogram_path)
-                
-                logger.info(f"Created segment {i+1}/{num_segments}: {spectrogram_path} "
-                           f"(start: {start_ms}ms, duration: {len(segment)}ms)")
-            
-            except KeyboardInterrupt:
-                logger.warning("Processing interrupted by user")
-                raise
-            except MemoryError:
-                logger.error(f"Out of memory processing segment {i+1}")
-                raise
-            except Exception as e:
-                logger.error(f"Unexpected error processing segment {i+1}: {e}")
-                logger.debug(traceback.format_exc())
+        max_workers = min(os.cpu_count() or 1, len(tasks))
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_segment_worker,
+                                       initargs=(self,))
+        try:
+            return executor.map(_process_segment, tasks)
+        finally:
+            executor.shutdown(wait=False)
+    
+    def segment_audio_file(self, input_file: str) -> List[np.ndarray]:
+        
+        segments, sr = self._load_segments(input_file)
+        
+        try:
+            segment_spectrograms = list(self._generate_spectrograms(segments, sr, max(1, len(segments))))
+        except KeyboardInterrupt:
+            logger.warning("Processing interrupted by user")
+            raise
+        except MemoryError:
+            logger.error("Out of memory processing segments")
+            raise
+        
+        spectrograms = []
+        
+        for (i, start_ms, segment), spectrogram in zip(segments, segment_spectrograms):
+            if spectrogram is None:
                 continue
+            
+            self._finish_segment(i, start_ms, segment, sr, len(segments), spectrogram)
+            spectrograms.append(spectrogram)
         
-        if not spectrogram_paths:
+        if not spectrograms:
             raise RuntimeError("No spectrograms were successfully generated")
         
-        return spectrogram_paths
+        return spectrograms
+    
+    def iter_segment_spectrograms(self, input_file: str, batch_size: int = 8) -> Iterator[np.ndarray]:
+        
+        segments, sr = self._load_segments(input_file)
+        
+        return self._finish_segments(segments, sr, self._generate_spectrograms(segments, sr, batch_size))
+    
+    def _finish_segments(self, segments: List[Tuple[int, int, np.ndarray]], sr: int,
+                         segment_spectrograms: Iterator[Optional[np.ndarray]]) -> Iterator[np.ndarray]:
+        
+        num_generated = 0
+        
+        for (i, start_ms, segment), spectrogram in zip(segments, segment_spectrograms):
+            if spectrogram is None:
+                continue
+            
+            self._finish_segment(i, start_ms, segment, sr, len(segments), spectrogram)
+            num_generated += 1
+            yield spectrogram
+        
+        if not num_generated:
+            raise RuntimeError("No spectrograms were successfully generated")
+
+_worker_processor = None
+
+def _init_segment_worker(processor: 'AudioProcessor') -> None:
+    
+    global _worker_processor
+    _worker_processor = processor
+
+def _process_segment(task: Tuple[int, np.ndarray, int], processor: 'AudioProcessor' = None) -> Optional[np.ndarray]:
+    
+    i, segment, sr = task
+    processor = processor or _worker_processor
+    
+    try:
+        return processor._mel_from_array(segment, sr, preemphasize=False)
+    except Exception as e:
+        logger.error("Failed to generate spectrogram for segment %s: %s", i+1, e)
+        return None
 
 class CNNModelPredictor:
     
-    def __init__(self, model_path: str, class_names: List[str] = None):
+    def __init__(self, model_path: str, class_names: List[str] = None, quantize_int8: bool = False,
+                 num_threads: Optional[int] = None):
         
         self.model_path = model_path
         self.class_names = class_names or self._load_class_names()
+        self.quantize_int8 = quantize_int8
+        self.num_threads = num_threads or max(1, (os.cpu_count() or 1) // 2)
         self.model = None
         self.interpreter = None
         self.input_details = None
         self.output_details = None
         self.use_tflite = False
+        self._batch_size = None
+        self._class_names_tuple = tuple(self.class_names)
+        self._inp_idx = None
+        self._out_idx = None
+        self._inp_scale, self._inp_zp = 0.0, 0
+        self._out_scale, self._out_zp = 0.0, 0
+        self._inp_int8 = False
+        self._out_int8 = False
     
     def _load_class_names(self) -> List[str]:
         
@@ -447,10 +688,10 @@ class CNNModelPredictor:
                 with open(class_names_path, 'r') as f:
                     return [line.strip() for line in f.readlines() if line.strip()]
             else:
-                logger.warning(f"Class names file not found at {class_names_path}, using defaults")
+                logger.warning("Class names file not found at %s, using defaults", class_names_path)
                 return ['blocks', 'prolongations', 'repetitions']
         except Exception as e:
-            logger.warning(f"Error loading class names: {e}, using defaults")
+            logger.warning("Error loading class names: %s, using defaults", e)
             return ['blocks', 'prolongations', 'repetitions']
         
     def load_model(self) -> None:
@@ -465,172 +706,399 @@ class CNNModelPredictor:
             raise PermissionError(f"Cannot read model file: {self.model_path}")
         
         if self.model_path.endswith('.tflite') and TFLITE_AVAILABLE:
-            try:
-                logger.info(f"Loading optimized TensorFlow Lite model from: {self.model_path}")
-                self.interpreter = tflite.Interpreter(model_path=self.model_path)
-                self.interpreter.allocate_tensors()
-                
-                self.input_details = self.interpreter.get_input_details()
-                self.output_details = self.interpreter.get_output_details()
-                
-                self.use_tflite = True
-                logger.info("Optimized TensorFlow Lite model loaded successfully")
-            except Exception as e:
-                logger.error(f"Failed to load TFLite model: {e}")
-                logger.error(traceback.format_exc())
-                raise
+            self._load_tflite_interpreter(self.model_path)
             
         elif self.model_path.endswith('.keras'):
             try:
-                logger.info(f"Loading Keras model from: {self.model_path}")
+                logger.info("Loading Keras model from: %s", self.model_path)
                 self.model = load_model(self.model_path)
                 self.use_tflite = False
                 logger.info("Keras model loaded successfully")
             except Exception as e:
-                logger.error(f"Failed to load Keras model: {e}")
-                logger.error(traceback.format_exc())
+                logger.exception("Failed to load Keras model: %s", e)
                 raise
             
+            if self.quantize_int8:
+                self._load_int8_model()
+            
         elif self.model_path.endswith('.h5'):
             try:
-                logger.info(f"Loading Keras H5 model from: {self.model_path}")
+                logger.info("Loading Keras H5 model from: %s", self.model_path)
                 self.model = load_model(self.model_path)
                 self.use_tflite = False
                 logger.info("Keras H5 model loaded successfully")
             except Exception as e:
-                logger.error(f"Failed to load H5 model: {e}")
-                logger.error(traceback.format_exc())
+                logger.exception("Failed to load H5 model: %s", e)
                 raise
             
+            if self.quantize_int8:
+                self._load_int8_model()
+            
         else:
 
             try:
-                logger.info(f"Loading Keras model from: {self.model_path}")
+                logger.info("Loading Keras model from: %s", self.model_path)
                 if not TFLITE_AVAILABLE:
                     logger.warning("TensorFlow Lite not available, using Keras model")
                 self.model = load_model(self.model_path)
                 self.use_tflite = False
                 logger.info("Keras model loaded successfully")
             except Exception as e:
-                logger.error(f"Failed to load model: {e}")
-                logger.error(traceback.format_exc())
+                logger.exception("Failed to load model: %s", e)
                 raise
     
-    def predict_image(self, image_path: str) -> Dict[str, float]:
+    def _load_tflite_interpreter(self, tflite_path: str) -> None:
         
-        if self.use_tflite:
-            if self.interpreter is None:
-                raise RuntimeError("TFLite model not loaded. Call load_model() first.")
-        else:
-            if self.model is None:
-                raise RuntimeError("Keras model not loaded. Call load_model() first.")
+        try:
+            logger.info("Loading optimized TensorFlow Lite model from: %s", tflite_path)
+            self.interpreter = tflite.Interpreter(model_path=tflite_path, num_threads=self.num_threads)
+            self.interpreter.allocate_tensors()
+            
+            if logger.isEnabledFor(logging.DEBUG) and hasattr(self.interpreter, '_get_ops_details'):
+                op_names = [op['op_name'] for op in self.interpreter._get_ops_details()]
+                logger.debug("TFLite interpreter using %s threads, %s delegated of %s ops", self.num_threads, op_names.count('DELEGATE'), len(op_names))
+            
+            self.input_details = self.interpreter.get_input_details()
+            self.output_details = self.interpreter.get_output_details()
+            self._batch_size = int(self.input_details[0]['shape'][0])
+            self._inp_idx = self.input_details[0]['index']
+            self._out_idx = self.output_details[0]['index']
+            self._inp_scale, self._inp_zp = self.input_details[0]['quantization']
+            self._out_scale, self._out_zp = self.output_details[0]['quantization']
+            self._inp_int8 = self.input_details[0]['dtype'] == np.int8
+            self._out_int8 = self.output_details[0]['dtype'] == np.int8
+            
+            self.use_tflite = True
+            logger.info("Optimized TensorFlow Lite model loaded successfully")
+        except Exception as e:
+            logger.exception("Failed to load TFLite model: %s", e)
+            raise
+    
+    def _load_int8_model(self) -> None:
         
-        if not isinstance(image_path, str) or not image_path:
-            raise ValueError(f"Invalid image_path: {image_path}")
+        if not TFLITE_AVAILABLE:
+            logger.warning("TensorFlow Lite not available, skipping INT8 quantization")
+            return
         
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+        int8_path = int8_model_path(self.model_path)
         
-        if not os.access(image_path, os.R_OK):
-            raise PermissionError(f"Cannot read image file: {image_path}")
+        if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < os.path.getmtime(self.model_path):
+            logger.warning("No up-to-date INT8 model at %s, using Keras model. Create it with export_int8_model().", int8_path)
+            return
         
         try:
-            if self.use_tflite:
-
-                img = load_img(image_path, target_size=(128, 128))
-                img_array = img_to_array(img)
-                img_array = img_array.astype(np.float32) / 255.0
-                img_array = np.expand_dims(img_array, axis=0)
-            else:
-
-                img = load_img(image_path, target_size=(128, 128))
-                img_array = img_to_array(img)
-                img_array = img_array / 255.0
-                img_array = np.expand_dims(img_array, axis=0)
+            self._load_tflite_interpreter(int8_path)
+            self.model = None
         except Exception as e:
-            logger.error(f"Failed to load/preprocess image {image_path}: {e}")
+            logger.warning("Failed to load INT8 model, using Keras model: %s", e)
+            self.interpreter = None
+            self.use_tflite = False
+    
+    def predict_image(self, image_path: str) -> Dict[str, float]:
+        
+        if not isinstance(image_path, str) or not image_path:
+            raise ValueError(f"Invalid image_path: {image_path}")
+        
+        try:
+            img = load_img(image_path, target_size=(128, 128))
+            img_array = img_to_array(img).astype(np.float32) / 255.0
+        except Exception as e:
+            logger.error("Failed to load/preprocess image %s: %s", image_path, e)
             raise
         
         if img_array is None or img_array.size == 0:
             raise ValueError(f"Invalid preprocessed image from {image_path}")
         
+        return self.predict_array(img_array)
+    
+    def predict_array(self, spectrogram: np.ndarray) -> Dict[str, float]:
+        
+        if not isinstance(spectrogram, np.ndarray) or spectrogram.size == 0:
+            raise ValueError("spectrogram must be a non-empty numpy array")
+        
+        predictions = self.predict_batch(np.expand_dims(spectrogram, axis=0))
+        
+        return self._predictions_to_dict(predictions[0])
+    
+    def predict_batch(self, spectrograms: np.ndarray) -> np.ndarray:
+        
+        if self.use_tflite:
+            if self.interpreter is None:
+                raise RuntimeError("TFLite model not loaded. Call load_model() first.")
+        else:
+            if self.model is None:
+                raise RuntimeError("Keras model not loaded. Call load_model() first.")
+        
+        if not isinstance(spectrograms, np.ndarray) or spectrograms.ndim < 2 or len(spectrograms) == 0:
+            raise ValueError(f"spectrograms must be a non-empty batched array, got {getattr(spectrograms, 'shape', type(spectrograms))}")
+        
+        input_array = spectrograms.astype(np.float32, copy=False)
+        batch_size = len(input_array)
+        
         try:
             if self.use_tflite:
+                if batch_size != self._batch_size:
+                    self.interpreter.resize_tensor_input(self._inp_idx, [batch_size, *input_array.shape[1:]])
+                    self.interpreter.allocate_tensors()
+                    self._batch_size = batch_size
+                
+                if self._inp_int8:
+                    input_array = np.clip(np.round(input_array / self._inp_scale + self._inp_zp), -128, 127).astype(np.int8)
 
-                self.interpreter.set_tensor(self.input_details[0]['index'], img_array)
+                self.interpreter.set_tensor(self._inp_idx, input_array)
                 
                 self.interpreter.invoke()
                 
-                predictions = self.interpreter.get_tensor(self.output_details[0]['index'])
+                predictions = self.interpreter.get_tensor(self._out_idx)
+                
+                if self._out_int8:
+                    predictions = (predictions.astype(np.float32) - self._out_zp) * self._out_scale
             else:
 
-                predictions = self.model.predict(img_array, verbose=0)
+                predictions = self.model(input_array, training=False).numpy()
         except Exception as e:
-            logger.error(f"Prediction failed for {image_path}: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Prediction failed: %s", e)
             raise
         
-        if predictions is None or len(predictions) == 0 or len(predictions[0]) == 0:
-            raise ValueError(f"Invalid predictions from model for {image_path}")
+        if predictions is None or len(predictions) != batch_size or predictions.shape[-1] == 0:
+            raise ValueError("Invalid predictions from model")
         
-        if len(predictions[0]) != len(self.class_names):
-            logger.warning(f"Prediction length ({len(predictions[0])}) doesn't match class names ({len(self.class_names)})")
+        if predictions.shape[-1] != len(self.class_names):
+            logger.warning("Prediction length (%s) doesn't match class names (%s)", predictions.shape[-1], len(self.class_names))
+        
+        return predictions
+    
+    def _predictions_to_dict(self, predictions: np.ndarray) -> Dict[str, float]:
         
         try:
-            result = {}
-            for i, class_name in enumerate(self.class_names):
-                if i < len(predictions[0]):
-                    result[class_name] = float(predictions[0][i])
-                else:
-                    result[class_name] = 0.0
+            values = predictions.tolist()
+            result = dict(zip(self._class_names_tuple, values))
+            if len(values) < len(self._class_names_tuple):
+                result.update(dict.fromkeys(self._class_names_tuple[len(values):], 0.0))
         except (IndexError, ValueError) as e:
-            logger.error(f"Error converting predictions to dictionary: {e}")
+            logger.error("Error converting predictions to dictionary: %s", e)
             raise
         
         return result
     
-    def predict_spectrograms(self, spectrogram_paths: List[str]) -> List[Dict[str, any]]:
+    def predict_spectrograms(self, spectrograms: List[np.ndarray], start_index: int = 0,
+                             max_batch: int = 32) -> List[Dict[str, any]]:
+        
+        if not spectrograms:
+            return []
+        
+        if len(spectrograms) > max_batch:
+            results = []
+            for offset in range(0, len(spectrograms), max_batch):
+                results.extend(self.predict_spectrograms(spectrograms[offset:offset + max_batch],
+                                                         start_index + offset, max_batch))
+            return results
+        
+        try:
+            batch_predictions = self.predict_batch(np.stack(spectrograms))
+        except Exception as e:
+            logger.error("Error predicting %s segments: %s", len(spectrograms), e)
+            return [{
+                'segment_index': i + 1,
+                'error': str(e),
+                'timestamp_start': i * 5.0,
+                'timestamp_end': (i + 1) * 5.0
+            } for i in range(start_index, start_index + len(spectrograms))]
+        
+        num_classes = min(batch_predictions.shape[1], len(self._class_names_tuple))
+        class_scores = batch_predictions[:, :num_classes]
+        best_indices = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_scores)), best_indices]
         
         results = []
         
-        for i, path in enumerate(spectrogram_paths):
+        for i, (segment_predictions, best_index, confidence) in enumerate(
+                zip(batch_predictions, best_indices.tolist(), confidences.tolist()), start_index):
+            predicted_class = self._class_names_tuple[best_index]
+            
+            results.append({
+                'segment_index': i + 1,
+                'predictions': self._predictions_to_dict(segment_predictions),
+                'predicted_class': predicted_class,
+                'confidence': confidence,
+                'timestamp_start': i * 5.0,
+                'timestamp_end': (i + 1) * 5.0
+            })
+            logger.info("Segment %s: %s (confidence: %.3f)", i+1, predicted_class, confidence)
+        
+        return results
+    
+    def predict_stream(self, spectrograms: Iterable[np.ndarray], min_batch_size: int = 4,
+                       max_batch_size: int = 8) -> List[Dict[str, any]]:
+        
+        spectrogram_queue = queue.Queue(maxsize=4)
+        stop = threading.Event()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    spectrogram_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
             try:
-                predictions = self.predict_image(path)
-                
-                predicted_class = max(predictions, key=predictions.get)
-                confidence = predictions[predicted_class]
-                
-                result = {
-                    'segment_index': i + 1,
-                    'image_path': path,
-                    'predictions': predictions,
-                    'predicted_class': predicted_class,
-                    'confidence': confidence,
-                    'timestamp_start': i * 5.0,
-                    'timestamp_end': (i + 1) * 5.0
-                }
-                
-                results.append(result)
-                logger.info(f"Segment {i+1}: {predicted_class} (confidence: {confidence:.3f})")
-                
-            except Exception as e:
-                logger.error(f"Error predicting segment {i+1}: {e}")
-                results.append({
-                    'segment_index': i + 1,
-                    'image_path': path,
-                    'error': str(e),
-                    'timestamp_start': i * 5.0,
-                    'timestamp_end': (i + 1) * 5.0
-                })
+                for spectrogram in spectrograms:
+                    if not put(spectrogram):
+                        logger.debug("Consumer stopped, abandoning remaining segments")
+                        break
+            finally:
+                put(_END_OF_STREAM)
+        
+        def consume():
+            results = []
+            finished = False
+            
+            try:
+                while not finished:
+                    batch = []
+                    while len(batch) < max_batch_size:
+                        try:
+                            spectrogram = spectrogram_queue.get(block=len(batch) < min_batch_size)
+                        except queue.Empty:
+                            break
+                        if spectrogram is _END_OF_STREAM:
+                            finished = True
+                            break
+                        batch.append(spectrogram)
+                    
+                    if batch:
+                        results.extend(self.predict_spectrograms(batch, start_index=len(results)))
+            except BaseException:
+                stop.set()
+                raise
+            
+            return results
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            producer = executor.submit(produce)
+            consumer = executor.submit(consume)
+            results = consumer.result()
+            producer.result()
         
         return results
 
-def process_audio_file(input_file: str, model_path: str, output_dir: str = None) -> Dict[str, any]:
+_END_OF_STREAM = object()
+
+@tf.keras.utils.register_keras_serializable(package='speech_portfolio')
+class MelSpectrogramLayer(tf.keras.layers.Layer):
+    
+    def __init__(self, sample_rate: int = 22050, target_size: Tuple[int, int] = (128, 128), **kwargs):
+        
+        super().__init__(**kwargs)
+        self.sample_rate = sample_rate
+        self.target_size = tuple(target_size)
+        self.mel_matrix = tf.constant(
+            librosa.filters.mel(sr=sample_rate, n_fft=2048, n_mels=128, fmin=50, fmax=sample_rate // 2).T,
+            dtype=tf.float32)
+    
+    def call(self, audio):
+        
+        emphasized = audio - 0.97 * tf.pad(audio[:, :-1], [[0, 0], [1, 0]])
+        padded = tf.pad(emphasized, [[0, 0], [1024, 1024]])
+        
+        stft = tf.signal.stft(padded, frame_length=2048, frame_step=512, fft_length=2048,
+                              window_fn=tf.signal.hann_window)
+        power = tf.square(tf.abs(stft))
+        mel = tf.tensordot(power, self.mel_matrix, 1)
+        
+        mel_db = 10.0 * tf.math.log(tf.maximum(mel, 1e-10)) / tf.math.log(10.0)
+        mel_db -= tf.reduce_max(mel_db, axis=[1, 2], keepdims=True)
+        mel_db = tf.maximum(mel_db, -80.0)
+        
+        image = tf.image.resize(tf.expand_dims(tf.transpose(mel_db, [0, 2, 1]), -1), self.target_size)
+        image -= tf.reduce_min(image, axis=[1, 2, 3], keepdims=True)
+        image = tf.math.divide_no_nan(image, tf.reduce_max(image, axis=[1, 2, 3], keepdims=True))
+        
+        return tf.repeat(image, 3, axis=-1)
+    
+    def get_config(self):
+        
+        config = super().get_config()
+        config.update({'sample_rate': self.sample_rate, 'target_size': self.target_size})
+        return config
+
+def build_raw_audio_model(cnn_model: tf.keras.Model, segment_duration: float = 3.0,
+                          sample_rate: int = 22050) -> tf.keras.Model:
+    
+    target_size = tuple(cnn_model.input_shape[1:3])
+    audio = tf.keras.Input(shape=(int(segment_duration * sample_rate),), name='audio')
+    spectrogram = MelSpectrogramLayer(sample_rate=sample_rate, target_size=target_size)(audio)
+    
+    return tf.keras.Model(audio, cnn_model(spectrogram), name='raw_audio_cnn')
+
+def export_raw_audio_model(model_path: str, output_path: str, segment_duration: float = 3.0) -> str:
+    
+    if not output_path.endswith('.keras'):
+        raise ValueError(f"output_path must end with .keras, got {output_path}")
+    
+    model = build_raw_audio_model(load_model(model_path), segment_duration=segment_duration)
+    model.save(output_path)
+    logger.info("Raw audio model saved to: %s", output_path)
+    
+    tflite_path = f"{os.path.splitext(output_path)[0]}.tflite"
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(tflite_path, 'wb') as f:
+        f.write(converter.convert())
+    logger.info("Raw audio TensorFlow Lite model saved to: %s", tflite_path)
+    
+    return tflite_path
+
+def int8_model_path(model_path: str) -> str:
+    
+    return f"{os.path.splitext(model_path)[0]}_int8.tflite"
+
+def export_int8_model(model_path: str, calibration_files: List[str], output_path: Optional[str] = None) -> str:
+    
+    if not calibration_files:
+        raise ValueError("At least one calibration audio file is required")
+    
+    if output_path is None:
+        output_path = int8_model_path(model_path)
+    if not output_path.endswith('.tflite'):
+        raise ValueError(f"output_path must end with .tflite, got {output_path}")
+    
+    samples = []
+    with AudioProcessor() as processor:
+        for calibration_file in calibration_files:
+            samples.extend(processor.segment_audio_file(calibration_file))
+    
+    logger.info("Calibrating INT8 model on %s segments from %s files", len(samples), len(calibration_files))
+    
+    def representative_dataset():
+        for sample in samples:
+            yield [np.expand_dims(sample.astype(np.float32, copy=False), axis=0)]
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(load_model(model_path))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    logger.info("INT8 TensorFlow Lite model saved to: %s", output_path)
+    
+    return output_path
+
+def process_audio_file(input_file: str, model_path: str, output_dir: str = None,
+                       save_spectrograms: bool = False, quantize_int8: bool = False,
+                       raw_audio: bool = False, max_batch: int = 32) -> Dict[str, any]:
     
     if not isinstance(input_file, str) or not input_file:
         raise ValueError(f"Invalid input_file: {input_file}")
     if not isinstance(model_path, str) or not model_path:
         raise ValueError(f"Invalid model_path: {model_path}")
+    if not isinstance(max_batch, int) or max_batch <= 0:
+        raise ValueError(f"max_batch must be a positive integer, got {max_batch}")
     
     if output_dir is None:
         output_dir = os.path.dirname(input_file) if input_file else os.getcwd()
@@ -639,7 +1107,7 @@ def process_audio_file(input_file: str, model_path: str, output_dir: str = None)
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
     except (OSError, PermissionError) as e:
-        logger.error(f"Cannot create output directory {output_dir}: {e}")
+        logger.error("Cannot create output directory %s: %s", output_dir, e)
         raise
     
     results = {
@@ -653,41 +1121,70 @@ def process_audio_file(input_file: str, model_path: str, output_dir: str = None)
     
     try:
 
-        with AudioProcessor() as processor:
+        spectrogram_dir = output_dir if save_spectrograms else None
+        
+        with AudioProcessor(spectrogram_dir=spectrogram_dir) as processor:
 
-            try:
-                spectrogram_paths = processor.segment_audio_file(input_file)
-            except Exception as e:
-                logger.error(f"Failed to segment audio file: {e}")
-                results['errors'].append(f"Segmentation error: {str(e)}")
-                return results
-            
-            if not spectrogram_paths:
-                logger.warning("No spectrograms were generated")
-                results['errors'].append("No spectrograms generated")
-                results['summary'] = {
-                    'total_segments': 0,
-                    'successful_predictions': 0,
-                    'class_distribution': {},
-                    'average_confidence': 0,
-                    'dominant_class': None
-                }
-                return results
-            
-            try:
-                predictor = CNNModelPredictor(model_path)
-                predictor.load_model()
-            except Exception as e:
-                logger.error(f"Failed to load model: {e}")
-                results['errors'].append(f"Model loading error: {str(e)}")
-                return results
-            
-            try:
-                predictions = predictor.predict_spectrograms(spectrogram_paths)
-            except Exception as e:
-                logger.error(f"Failed to get predictions: {e}")
-                results['errors'].append(f"Prediction error: {str(e)}")
-                return results
+            if raw_audio:
+
+                try:
+                    spectrograms = processor.segment_audio_samples(input_file)
+                except Exception as e:
+                    logger.error("Failed to segment audio file: %s", e)
+                    results['errors'].append(f"Segmentation error: {str(e)}")
+                    return results
+                
+                if not spectrograms:
+                    logger.warning("No spectrograms were generated")
+                    results['errors'].append("No spectrograms generated")
+                    results['summary'] = {
+                        'total_segments': 0,
+                        'successful_predictions': 0,
+                        'class_distribution': {},
+                        'average_confidence': 0,
+                        'dominant_class': None
+                    }
+                    return results
+                
+                try:
+                    predictor = CNNModelPredictor(model_path)
+                    predictor.load_model()
+                except Exception as e:
+                    logger.error("Failed to load model: %s", e)
+                    results['errors'].append(f"Model loading error: {str(e)}")
+                    return results
+                
+                try:
+                    predictions = predictor.predict_spectrograms(spectrograms, max_batch=max_batch)
+                except Exception as e:
+                    logger.error("Failed to get predictions: %s", e)
+                    results['errors'].append(f"Prediction error: {str(e)}")
+                    return results
+            else:
+
+                try:
+                    spectrograms = processor.iter_segment_spectrograms(input_file, min(8, max_batch))
+                except Exception as e:
+                    logger.error("Failed to segment audio file: %s", e)
+                    results['errors'].append(f"Segmentation error: {str(e)}")
+                    return results
+                
+                try:
+                    predictor = CNNModelPredictor(model_path, quantize_int8=quantize_int8)
+                    predictor.load_model()
+                except Exception as e:
+                    logger.error("Failed to load model: %s", e)
+                    results['errors'].append(f"Model loading error: {str(e)}")
+                    return results
+                
+                try:
+                    predictions = predictor.predict_stream(spectrograms,
+                                                           min_batch_size=min(4, max_batch),
+                                                           max_batch_size=min(8, max_batch))
+                except Exception as e:
+                    logger.error("Failed to segment audio file: %s", e)
+                    results['errors'].append(f"Segmentation error: {str(e)}")
+                    return results
             
             results['segments'] = predictions
             
@@ -711,7 +1208,7 @@ def process_audio_file(input_file: str, model_path: str, output_dir: str = None)
                         'dominant_class': max(class_counts, key=class_counts.get) if class_counts else None
                     }
                 except Exception as e:
-                    logger.error(f"Error calculating summary statistics: {e}")
+                    logger.error("Error calculating summary statistics: %s", e)
                     results['errors'].append(f"Summary calculation error: {str(e)}")
             else:
                 results['summary'] = {
@@ -722,7 +1219,7 @@ def process_audio_file(input_file: str, model_path: str, output_dir: str = None)
                     'dominant_class': None
                 }
             
-            logger.info(f"Processing complete. {len(successful_predictions)}/{len(predictions)} segments processed successfully")
+            logger.info("Processing complete. %s/%s segments processed successfully", len(successful_predictions), len(predictions))
             
     except KeyboardInterrupt:
         logger.warning("Processing interrupted by user")
@@ -733,24 +1230,46 @@ def process_audio_file(input_file: str, model_path: str, output_dir: str = None)
         results['errors'].append("Out of memory error")
         raise
     except Exception as e:
-        logger.error(f"Error processing audio file: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error processing audio file: %s", e)
         results['errors'].append(str(e))
     
     return results
 
 def main():
     
+    logging.basicConfig(level=logging.INFO)
+    
     try:
         parser = argparse.ArgumentParser(description='Process audio file for CNN analysis')
         parser.add_argument('input_file', help='Path to input audio file')
         parser.add_argument('model_path', help='Path to trained CNN model')
         parser.add_argument('--output-dir', help='Output directory for results')
         parser.add_argument('--output-json', help='Path to save results as JSON')
+        parser.add_argument('--save-spectrograms', action='store_true',
+                            help='Also write each segment spectrogram as a PNG to the output directory')
+        parser.add_argument('--quantize-int8', action='store_true',
+                            help='Run Keras models through the INT8 TensorFlow Lite model written by --export-int8')
+        parser.add_argument('--export-int8', action='store_true',
+                            help='Calibrate an INT8 TensorFlow Lite model on the input file and --calibration-files, save it next to the model and exit')
+        parser.add_argument('--calibration-files', nargs='+', default=[],
+                            help='Additional audio files used to calibrate --export-int8')
+        parser.add_argument('--raw-audio', action='store_true',
+                            help='Model takes raw audio segments (see export_raw_audio_model)')
+        parser.add_argument('--max-batch', type=int, default=32,
+                            help='Maximum number of segments per model forward pass')
         
         args = parser.parse_args()
         
-        results = process_audio_file(args.input_file, args.model_path, args.output_dir)
+        if args.export_int8:
+            int8_path = export_int8_model(args.model_path, [args.input_file, *args.calibration_files])
+            print(f"INT8 model saved to: {int8_path}")
+            return 0
+        
+        results = process_audio_file(args.input_file, args.model_path, args.output_dir,
+                                     save_spectrograms=args.save_spectrograms,
+                                     quantize_int8=args.quantize_int8,
+                                     raw_audio=args.raw_audio,
+                                     max_batch=args.max_batch)
         
         if args.output_json:
             try:
@@ -760,9 +1279,9 @@ def main():
                 
                 with open(args.output_json, 'w') as f:
                     json.dump(results, f, indent=2)
-                logger.info(f"Results saved to: {args.output_json}")
+                logger.info("Results saved to: %s", args.output_json)
             except (OSError, PermissionError, json.JSONEncodeError) as e:
-                logger.error(f"Failed to save results to JSON: {e}")
+                logger.error("Failed to save results to JSON: %s", e)
         
         print(f"\nProcessing Summary:")
         print(f"Input file: {results['input_file']}")
@@ -783,8 +1302,7 @@ def main():
         logger.warning("\nProcess interrupted by user")
         return 130
     except Exception as e:
-        logger.error(f"Fatal error in main: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Fatal error in main: %s", e)
         return 1
 
 if __name__ == "__main__":
@@ -2,174 +2,291 @@
 import os
 import sys
 import json
+import errno
+import functools
 import subprocess
 import tempfile
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import logging
-import numpy as np
-import traceback
+from types import MappingProxyType
 import shutil
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+if TYPE_CHECKING:
+    import numpy as np
 
-from audio_processor import process_audio_file
-from precise_stuttering_detector import PreciseStutteringDetector, analyze_audio_with_precise_detection
+_HERE = Path(__file__).resolve().parent
+
+sys.path.insert(0, str(_HERE))
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_DEFAULT_MODEL_CANDIDATES = (
+    (_HERE / 'models', 'cnn_model.h5'),
+    (_HERE, 'cnn_model.h5'),
+    (_HERE.parent / 'models', 'cnn_model.h5'),
+
+    (_HERE / 'models', 'cnn_model.tflite'),
+    (_HERE, 'cnn_model.tflite'),
+    (_HERE.parent / 'models', 'cnn_model.tflite'),
+)
+
+_SEVERITY_THRESHOLDS = (0.4, 0.6, 0.8)
+_SEVERITY_LABELS = ('very_low', 'low', 'medium', 'high')
+
+_PRECISE_PROCESSING_DETAILS = MappingProxyType({
+    'segmentDuration': '3.0 seconds',
+    'overlapRatio': '50%',
+    'modelType': 'H5 CNN with Precise Detection'
+})
+
+_PROCESSING_DETAILS = MappingProxyType({
+    'segmentDuration': '5.0 seconds',
+    'modelType': 'H5 CNN'
+})
+
+def _error_result(error: str, model_path: Optional[str], input_file: str) -> Dict[str, any]:
+    
+    return {
+        'events': [],
+        'summary': {
+            'segmentCount': 0,
+            'hasEvents': False,
+            'error': error
+        },
+        'processing_info': {
+            'error': error,
+            'model_path': model_path,
+            'input_file': input_file
+        }
+    }
+
+def _json_default(obj):
+    
+    import numpy as np
+    
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _dumps(obj, indent: bool = False) -> bytes:
+    
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_json_default, option=option)
+    
+    return json.dumps(obj, default=_json_default, indent=2 if indent else None).encode()
+
+def _analyze_segment(task: Tuple[str, Dict[str, float]]) -> Tuple[Optional[Dict[str, any]], Optional[str]]:
+    
+    from precise_stuttering_detector import analyze_audio_with_precise_detection
+    
+    audio_path, predictions = task
+    
+    try:
+        return analyze_audio_with_precise_detection(audio_path, predictions), None
+    except Exception as e:
+        return None, str(e)
+
+def _safe_stat(path: str) -> Optional[os.stat_result]:
+    
+    try:
+        return os.stat(path)
+    except OSError as e:
+        if e.errno in (errno.ENOENT, errno.ENOTDIR, errno.ENAMETOOLONG):
+            return None
+        raise
+
+def _list_dir(directory: Path) -> frozenset:
+    
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError as e:
+        logger.debug("Cannot list candidate model directory %s: %s", directory, e)
+        return frozenset()
+
+@functools.lru_cache(maxsize=1)
+def _severity_labels() -> 'np.ndarray':
+    
+    import numpy as np
+    return np.array(_SEVERITY_LABELS, dtype=object)
+
+@functools.lru_cache(maxsize=1)
+def _find_default_model() -> Optional[str]:
+    
+    listings = {}
+    
+    for directory, filename in _DEFAULT_MODEL_CANDIDATES:
+        if directory not in listings:
+            listings[directory] = _list_dir(directory)
+        
+        if filename in listings[directory]:
+            path = str(directory / filename)
+            model_type = "H5" if path.endswith('.h5') else "TFLite"
+            logger.info("Found %s model at: %s", model_type, path)
+            return path
+    
+    logger.warning("No CNN model found. Please provide model_path.")
+    return None
+
 class CNNAnalysisService:
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, max_batch: int = 32):
+        
+        self._precise_pool = None
+        self._precise_pool_workers = 0
         
         try:
-            self.model_path = model_path or self._find_default_model()
+            self.model_path = model_path or _find_default_model()
+            self.max_batch = max_batch
             self.temp_dir = None
+            self._model_validated = False
             
             if self.model_path and not isinstance(self.model_path, str):
                 raise ValueError(f"model_path must be a string, got {type(self.model_path)}")
+            if not isinstance(max_batch, int) or max_batch <= 0:
+                raise ValueError(f"max_batch must be a positive integer, got {max_batch}")
             
         except Exception as e:
-            logger.error(f"Failed to initialize CNNAnalysisService: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Failed to initialize CNNAnalysisService: %s", e)
             raise
         
-    def _find_default_model(self) -> Optional[str]:
-        
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), 'models', 'cnn_model.h5'),
-            os.path.join(os.path.dirname(__file__), 'cnn_model.h5'),
-            os.path.join(os.path.dirname(__file__), '..', 'models', 'cnn_model.h5'),
-
-            os.path.join(os.path.dirname(__file__), 'models', 'cnn_model.tflite'),
-            os.path.join(os.path.dirname(__file__), 'cnn_model.tflite'),
-            os.path.join(os.path.dirname(__file__), '..', 'models', 'cnn_model.tflite'),
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                model_type = "H5" if path.endswith('.h5') else "TFLite"
-                logger.info(f"Found {model_type} model at: {path}")
-                return path
-        
-        logger.warning("No CNN model found. Please provide model_path.")
-        return None
-    
     def __enter__(self):
         
         try:
             self.temp_dir = tempfile.mkdtemp()
             return self
         except (OSError, PermissionError) as e:
-            logger.error(f"Failed to create temporary directory: {e}")
+            logger.error("Failed to create temporary directory: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error creating temp directory: {e}")
+            logger.error("Unexpected error creating temp directory: %s", e)
             raise
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         
+        self.close()
+        
         if self.temp_dir and os.path.exists(self.temp_dir):
             try:
                 shutil.rmtree(self.temp_dir)
             except (OSError, PermissionError) as e:
-                logger.warning(f"Failed to clean up temporary directory {self.temp_dir}: {e}")
+                logger.warning("Failed to clean up temporary directory %s: %s", self.temp_dir, e)
             except Exception as e:
-                logger.warning(f"Unexpected error cleaning up temp directory: {e}")
+                logger.warning("Unexpected error cleaning up temp directory: %s", e)
     
-    def analyze_audio_file(self, audio_file_path: str, output_dir: str = None) -> Dict[str, any]:
+    def __del__(self):
         
-        if not isinstance(audio_file_path, str) or not audio_file_path:
-            raise ValueError(f"Invalid audio_file_path: {audio_file_path}")
+        self.close()
+    
+    def close(self) -> None:
         
-        if not os.path.exists(audio_file_path):
-            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        if self._precise_pool is not None:
+            self._precise_pool.shutdown()
+            self._precise_pool = None
+            self._precise_pool_workers = 0
+    
+    def _get_precise_pool(self, num_tasks: int) -> ProcessPoolExecutor:
         
-        if not os.access(audio_file_path, os.R_OK):
-            raise PermissionError(f"Cannot read audio file: {audio_file_path}")
+        max_workers = min(max(1, (os.cpu_count() or 1) - 1), num_tasks)
+        
+        if self._precise_pool_workers < max_workers:
+            self.close()
+            self._precise_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            self._precise_pool_workers = max_workers
+        
+        return self._precise_pool
+    
+    def _validate_model(self) -> None:
+        
+        if self._model_validated:
+            return
         
         if not self.model_path:
             raise ValueError("Model path not set. Cannot perform analysis.")
         
-        if not os.path.exists(self.model_path):
+        if _safe_stat(self.model_path) is None:
             raise FileNotFoundError(f"CNN model not found: {self.model_path}")
         
         if not os.access(self.model_path, os.R_OK):
             raise PermissionError(f"Cannot read model file: {self.model_path}")
         
-        logger.info(f"Starting CNN analysis for: {audio_file_path}")
+        self._model_validated = True
+    
+    def _validate_inputs(self, audio_file_path: str) -> None:
+        
+        if not isinstance(audio_file_path, str) or not audio_file_path:
+            raise ValueError(f"Invalid audio_file_path: {audio_file_path}")
+        
+        if _safe_stat(audio_file_path) is None:
+            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        
+        if not os.access(audio_file_path, os.R_OK):
+            raise PermissionError(f"Cannot read audio file: {audio_file_path}")
+        
+        self._validate_model()
+    
+    def analyze_audio_file(self, audio_file_path: str, output_dir: str = None) -> Dict[str, any]:
+        
+        from audio_processor import process_audio_file
+        
+        self._validate_inputs(audio_file_path)
+        
+        logger.info("Starting CNN analysis for: %s", audio_file_path)
         
         if output_dir is None:
             output_dir = self.temp_dir
         
         try:
-            results = process_audio_file(audio_file_path, self.model_path, output_dir)
+            results = process_audio_file(audio_file_path, self.model_path, output_dir, max_batch=self.max_batch)
         except Exception as e:
-            logger.error(f"Error processing audio file: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Error processing audio file: %s", e)
             raise
         
         try:
             formatted_results = self._format_results_for_flutter(results)
         except Exception as e:
-            logger.error(f"Error formatting results: {e}")
-            logger.error(traceback.format_exc())
-
-            return {
-                'events': [],
-                'summary': {
-                    'segmentCount': 0,
-                    'hasEvents': False,
-                    'error': str(e)
-                },
-                'processing_info': {
-                    'error': str(e),
-                    'model_path': self.model_path,
-                    'input_file': audio_file_path
-                }
-            }
+            logger.exception("Error formatting results: %s", e)
+            return _error_result(str(e), self.model_path, audio_file_path)
         
-        logger.info(f"CNN analysis complete. Found {len(formatted_results['events'])} events.")
+        logger.info("CNN analysis complete. Found %s events.", len(formatted_results['events']))
         return formatted_results
         
     def analyze_audio_file_precise(self, audio_file_path: str, output_dir: str = None) -> Dict[str, any]:
         
-        if not isinstance(audio_file_path, str) or not audio_file_path:
-            raise ValueError(f"Invalid audio_file_path: {audio_file_path}")
+        import numpy as np
+        from audio_processor import process_audio_file
         
-        if not os.path.exists(audio_file_path):
-            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        self._validate_inputs(audio_file_path)
         
-        if not os.access(audio_file_path, os.R_OK):
-            raise PermissionError(f"Cannot read audio file: {audio_file_path}")
-        
-        if not self.model_path:
-            raise ValueError("Model path not set. Cannot perform analysis.")
-        
-        if not os.path.exists(self.model_path):
-            raise FileNotFoundError(f"CNN model not found: {self.model_path}")
-        
-        logger.info(f"Starting precise CNN analysis for: {audio_file_path}")
+        logger.info("Starting precise CNN analysis for: %s", audio_file_path)
         
         if output_dir is None:
             output_dir = self.temp_dir
         
         try:
-            results = process_audio_file(audio_file_path, self.model_path, output_dir)
-        except Exception as e:
-            logger.error(f"Error processing audio file: {e}")
-            logger.error(traceback.format_exc())
-            raise
-        
-        try:
-            precise_detector = PreciseStutteringDetector()
+            results = process_audio_file(audio_file_path, self.model_path, output_dir, max_batch=self.max_batch)
         except Exception as e:
-            logger.error(f"Failed to initialize PreciseStutteringDetector: {e}")
+            logger.exception("Error processing audio file: %s", e)
             raise
         
-        precise_events = []
-        total_events = 0
+        tasks = []
         errors = []
         
         for segment in results.get('segments', []):
@@ -182,78 +299,123 @@ class CNNAnalysisService:
                 if not predictions:
                     predictions = {'blocks': 0.0, 'prolongations': 0.0, 'repetitions': 0.0, 'fluent': 1.0}
                 
-                try:
-                    segment_analysis = analyze_audio_with_precise_detection(
-                        segment.get('audio_path', ''), 
-                        predictions
-                    )
-                except Exception as e:
-                    logger.warning(f"Precise detection failed for segment {segment.get('segment_index', 'unknown')}: {e}")
-                    errors.append(f"Segment {segment.get('segment_index', 'unknown')}: {str(e)}")
-                    continue
-                
-                for event in segment_analysis.get('events', []):
-                    try:
-
-                        segment_start = segment.get('timestamp_start', 0)
-                        absolute_start = segment_start + event.get('start_time', 0)
-                        absolute_end = segment_start + event.get('end_time', 0)
-                        
-                        precise_event = {
-                            'type': event.get('type', 'unknown'),
-                            'confidence': event.get('confidence', 0.0),
-                            'probability': int(event.get('confidence', 0.0) * 100),
-                            'seconds': int(absolute_start),
-                            't0': int(absolute_start * 1000),
-                            't1': int(absolute_end * 1000),
-                            'duration': event.get('duration', 0),
-                            'severity': event.get('severity', 'low'),
-                            'source': 'cnn_model_precise',
-                            'model_version': 'h5_v1_precise',
-                            'segment_start': segment_start,
-                            'relative_start': event.get('start_time', 0),
-                            'relative_end': event.get('end_time', 0)
-                        }
-                        
-                        precise_events.append(precise_event)
-                        total_events += 1
-                    except (KeyError, ValueError, TypeError) as e:
-                        logger.warning(f"Error formatting event: {e}")
-                        continue
+                tasks.append((len(errors), segment.get('segment_index', 'unknown'), segment.get('timestamp_start', 0),
+                              segment.get('audio_path', ''), predictions))
+                errors.append(None)
                         
             except Exception as e:
-                logger.warning(f"Error processing segment: {e}")
+                logger.warning("Error processing segment: %s", e)
                 errors.append(str(e))
                 continue
         
+        if len(tasks) >= 2:
+            try:
+                segment_analyses = list(self._get_precise_pool(len(tasks)).map(_analyze_segment,
+                                                                                [task[3:] for task in tasks]))
+            except BrokenProcessPool as e:
+                logger.error("Precise detection worker pool failed: %s", e)
+                self.close()
+                raise
+        else:
+            segment_analyses = [_analyze_segment(task[3:]) for task in tasks]
+        
+        segment_events = []
+        
+        for (error_slot, segment_index, segment_start, _, _), (segment_analysis, error) in zip(tasks, segment_analyses):
+            try:
+                if error is not None:
+                    logger.warning("Precise detection failed for segment %s: %s", segment_index, error)
+                    errors[error_slot] = f"Segment {segment_index}: {error}"
+                    continue
+                
+                segment_events.append((segment_start, segment_analysis.get('events', [])))
+            except Exception as e:
+                logger.warning("Error processing segment: %s", e)
+                errors[error_slot] = str(e)
+                continue
+        
+        errors = [error for error in errors if error is not None]
+        
+        max_events = sum(len(events) for _, events in segment_events)
+        types = np.empty(max_events, dtype=object)
+        confidences = np.empty(max_events, dtype=object)
+        durations = np.empty(max_events, dtype=object)
+        severities = np.empty(max_events, dtype=object)
+        segment_starts = np.empty(max_events, dtype=object)
+        relative_starts = np.empty(max_events, dtype=object)
+        relative_ends = np.empty(max_events, dtype=object)
+        confidence_scores = np.empty(max_events, dtype=np.float64)
+        absolute_starts = np.empty(max_events, dtype=np.float64)
+        absolute_ends = np.empty(max_events, dtype=np.float64)
+        
+        total_events = 0
+        for segment_start, events in segment_events:
+            for event in events:
+                get = event.get
+                try:
+                    confidence = get('confidence', 0.0)
+                    relative_start = get('start_time', 0)
+                    relative_end = get('end_time', 0)
+                    confidence_scores[total_events] = confidence
+                    absolute_starts[total_events] = segment_start + relative_start
+                    absolute_ends[total_events] = segment_start + relative_end
+                    types[total_events] = get('type', 'unknown')
+                    confidences[total_events] = confidence
+                    durations[total_events] = get('duration', 0)
+                    severities[total_events] = get('severity', 'low')
+                    segment_starts[total_events] = segment_start
+                    relative_starts[total_events] = relative_start
+                    relative_ends[total_events] = relative_end
+                    total_events += 1
+                except (KeyError, ValueError, TypeError) as e:
+                    logger.warning("Error formatting event: %s", e)
+                    continue
+        
+        event_columns = {
+            'type': types[:total_events],
+            'confidence': confidences[:total_events],
+            'duration': durations[:total_events],
+            'severity': severities[:total_events],
+            'segment_start': segment_starts[:total_events],
+            'relative_start': relative_starts[:total_events],
+            'relative_end': relative_ends[:total_events],
+            'confidence_score': confidence_scores[:total_events],
+            'absolute_start': absolute_starts[:total_events],
+            'absolute_end': absolute_ends[:total_events]
+        }
+        
+        finite = (np.isfinite(event_columns['confidence_score'])
+                  & np.isfinite(event_columns['absolute_start'])
+                  & np.isfinite(event_columns['absolute_end']))
+        if not finite.all():
+            logger.warning("Skipping %d events with non-finite confidence or timing", np.count_nonzero(~finite))
+            event_columns = {name: column[finite] for name, column in event_columns.items()}
+            total_events = int(np.count_nonzero(finite))
+        
         try:
             total_segments = results.get('summary', {}).get('total_segments', 0)
             successful_predictions = results.get('summary', {}).get('successful_predictions', 0)
             
-            try:
-                avg_confidence = np.mean([e['confidence'] for e in precise_events]) if precise_events else 0.0
-            except (KeyError, ValueError, TypeError):
-                avg_confidence = 0.0
+            confidence_scores = event_columns['confidence_score']
+            avg_confidence = float(confidence_scores.mean()) if confidence_scores.size else 0.0
             
             summary = {
                 'segmentCount': total_segments,
                 'totalSegments': total_segments,
                 'successfulPredictions': successful_predictions,
                 'preciseEventsDetected': total_events,
-                'averageConfidence': float(avg_confidence),
-                'dominantType': self._get_dominant_type(precise_events),
-                'classDistribution': self._get_class_distribution(precise_events),
+                'averageConfidence': avg_confidence,
+                'dominantType': self._get_dominant_type(event_columns['type']),
+                'classDistribution': self._get_class_distribution(event_columns['type']),
                 'hasEvents': total_events > 0,
                 'processingDetails': {
                     'segmentsAnalyzed': total_segments,
                     'preciseEventsFound': total_events,
-                    'segmentDuration': '3.0 seconds',
-                    'overlapRatio': '50%',
-                    'modelType': 'H5 CNN with Precise Detection'
+                    **_PRECISE_PROCESSING_DETAILS
                 }
             }
         except Exception as e:
-            logger.error(f"Error creating summary: {e}")
+            logger.error("Error creating summary: %s", e)
             summary = {
                 'segmentCount': 0,
                 'totalSegments': 0,
@@ -267,7 +429,7 @@ class CNNAnalysisService:
             }
         
         formatted_results = {
-            'events': precise_events,
+            'events': self._precise_events_to_dicts(event_columns),
             'summary': summary,
             'processing_info': {
                 'model_path': self.model_path,
@@ -277,57 +439,82 @@ class CNNAnalysisService:
             }
         }
         
-        logger.info(f"Precise CNN analysis complete. Found {total_events} precise events.")
+        logger.info("Precise CNN analysis complete. Found %s precise events.", total_events)
         
         return formatted_results
     
-    def _get_dominant_type(self, events: List[Dict]) -> str:
+    def _get_dominant_type(self, event_types: 'np.ndarray') -> str:
         
-        if not events:
+        if not len(event_types):
             return 'none'
         
-        type_counts = {}
-        for event in events:
-            event_type = event['type']
-            type_counts[event_type] = type_counts.get(event_type, 0) + 1
-        
-        return max(type_counts, key=type_counts.get)
+        return Counter(event_types.tolist()).most_common(1)[0][0]
     
-    def _get_class_distribution(self, events: List[Dict]) -> Dict[str, int]:
+    def _get_class_distribution(self, event_types: 'np.ndarray') -> Dict[str, int]:
         
-        distribution = {}
-        for event in events:
-            event_type = event['type']
-            distribution[event_type] = distribution.get(event_type, 0) + 1
-        
-        return distribution
+        return dict(Counter(event_types.tolist()))
+    
+    def _precise_events_to_dicts(self, event_columns: Dict[str, 'np.ndarray']) -> List[Dict[str, any]]:
+        
+        import numpy as np
+        
+        absolute_starts = event_columns['absolute_start']
+        absolute_ends = event_columns['absolute_end']
+        
+        probabilities = (event_columns['confidence_score'] * 100).astype(np.int32)
+        seconds = absolute_starts.astype(np.int32)
+        t0 = (absolute_starts * 1000).astype(np.int32)
+        t1 = (absolute_ends * 1000).astype(np.int32)
+        
+        return [{
+            'type': event_type,
+            'confidence': confidence,
+            'probability': probability,
+            'seconds': second,
+            't0': start_ms,
+            't1': end_ms,
+            'duration': duration,
+            'severity': severity,
+            'source': 'cnn_model_precise',
+            'model_version': 'h5_v1_precise',
+            'segment_start': segment_start,
+            'relative_start': relative_start,
+            'relative_end': relative_end
+        } for event_type, confidence, probability, second, start_ms, end_ms, duration, severity, segment_start,
+              relative_start, relative_end in zip(
+            event_columns['type'].tolist(), event_columns['confidence'].tolist(), probabilities.tolist(), seconds.tolist(),
+            t0.tolist(), t1.tolist(), event_columns['duration'].tolist(), event_columns['severity'].tolist(),
+            event_columns['segment_start'].tolist(), event_columns['relative_start'].tolist(),
+            event_columns['relative_end'].tolist())]
     
     def _format_results_for_flutter(self, results: Dict[str, any]) -> Dict[str, any]:
         
-        events = []
+        import numpy as np
         
-        for segment in results.get('segments', []):
-            if 'error' in segment:
-                continue
-            
-            predicted_class = segment.get('predicted_class', 'none')
-            confidence = segment.get('confidence', 0.0)
-            
-            if predicted_class == 'none' or confidence < 0.3:
-                continue
-            
-            event = {
-                'type': predicted_class,
-                'confidence': confidence,
-                'probability': int(confidence * 100),
-                'seconds': int(segment['timestamp_start']),
-                't0': int(segment['timestamp_start'] * 1000),
-                't1': int(segment['timestamp_end'] * 1000),
-                'source': 'cnn_model',
-                'model_version': 'h5_v1'
-            }
-            
-            events.append(event)
+        segments = [segment for segment in results.get('segments', []) if 'error' not in segment]
+        
+        predicted_classes = np.array([segment.get('predicted_class', 'none') for segment in segments], dtype=object)
+        confidences = np.array([segment.get('confidence', 0.0) for segment in segments], dtype=np.float64)
+        
+        keep = np.flatnonzero((predicted_classes != 'none') & (confidences >= 0.3))
+        
+        kept_confidences = confidences[keep]
+        starts = np.array([segments[i]['timestamp_start'] for i in keep.tolist()], dtype=np.float64)
+        ends = np.array([segments[i]['timestamp_end'] for i in keep.tolist()], dtype=np.float64)
+        
+        events = [{
+            'type': predicted_class,
+            'confidence': confidence,
+            'probability': probability,
+            'seconds': seconds,
+            't0': t0,
+            't1': t1,
+            'source': 'cnn_model',
+            'model_version': 'h5_v1'
+        } for predicted_class, confidence, probability, seconds, t0, t1 in zip(
+            predicted_classes[keep].tolist(), kept_confidences.tolist(),
+            (kept_confidences * 100).astype(np.int32).tolist(), starts.astype(np.int32).tolist(),
+            (starts * 1000).astype(np.int32).tolist(), (ends * 1000).astype(np.int32).tolist())]
         
         total_segments = results['summary'].get('total_segments', 0)
         successful_predictions = results['summary'].get('successful_predictions', 0)
@@ -343,8 +530,7 @@ class CNNAnalysisService:
             'processingDetails': {
                 'segmentsAnalyzed': successful_predictions,
                 'disfluencySegments': len(events),
-                'segmentDuration': '5.0 seconds',
-                'modelType': 'H5 CNN'
+                **_PROCESSING_DETAILS
             }
         }
         
@@ -359,16 +545,13 @@ class CNNAnalysisService:
             }
         }
     
-    def _calculate_severity(self, confidence: float) -> str:
-        
-        if confidence >= 0.8:
-            return 'high'
-        elif confidence >= 0.6:
-            return 'medium'
-        elif confidence >= 0.4:
-            return 'low'
-        else:
-            return 'very_low'
+    def _calculate_severity(self, confidence: Union[float, 'np.ndarray']) -> Union[str, 'np.ndarray']:
+        
+        import numpy as np
+        
+        severity_index = np.searchsorted(_SEVERITY_THRESHOLDS, confidence, side='right')
+        
+        return _severity_labels()[np.where(np.isnan(confidence), 0, severity_index)]
 
 def run_analysis_from_flutter(audio_file_path: str, model_path: str = None, output_json_path: str = None) -> str:
     
@@ -379,6 +562,7 @@ def run_analysis_from_flutter(audio_file_path: str, model_path: str = None, outp
         
         with CNNAnalysisService(model_path) as service:
             results = service.analyze_audio_file(audio_file_path)
+            payload = _dumps(results, indent=bool(output_json_path))
             
             if output_json_path:
                 try:
@@ -386,69 +570,30 @@ def run_analysis_from_flutter(audio_file_path: str, model_path: str = None, outp
                     if output_dir and not os.path.exists(output_dir):
                         os.makedirs(output_dir, exist_ok=True)
                     
-                    with open(output_json_path, 'w') as f:
-                        json.dump(results, f, indent=2)
-                    logger.info(f"Results saved to: {output_json_path}")
-                except (OSError, PermissionError, json.JSONEncodeError) as e:
-                    logger.error(f"Failed to save results to JSON: {e}")
+                    with open(output_json_path, 'wb') as f:
+                        f.write(payload)
+                    logger.info("Results saved to: %s", output_json_path)
+                except OSError as e:
+                    logger.error("Failed to save results to JSON: %s", e)
 
-            return json.dumps(results)
+            return payload.decode()
             
     except KeyboardInterrupt:
         logger.warning("Analysis interrupted by user")
-        error_result = {
-            'events': [],
-            'summary': {
-                'segmentCount': 0,
-                'hasEvents': False,
-                'error': 'Analysis interrupted by user'
-            },
-            'processing_info': {
-                'error': 'Analysis interrupted by user',
-                'model_path': model_path,
-                'input_file': audio_file_path
-            }
-        }
-        return json.dumps(error_result)
+        return _dumps(_error_result('Analysis interrupted by user', model_path, audio_file_path)).decode()
     except MemoryError:
         logger.error("Out of memory during analysis")
-        error_result = {
-            'events': [],
-            'summary': {
-                'segmentCount': 0,
-                'hasEvents': False,
-                'error': 'Out of memory error'
-            },
-            'processing_info': {
-                'error': 'Out of memory error',
-                'model_path': model_path,
-                'input_file': audio_file_path
-            }
-        }
-        return json.dumps(error_result)
+        return _dumps(_error_result('Out of memory error', model_path, audio_file_path)).decode()
     except Exception as e:
-        error_result = {
-            'events': [],
-            'summary': {
-                'segmentCount': 0,
-                'hasEvents': False,
-                'error': str(e)
-            },
-            'processing_info': {
-                'error': str(e),
-                'model_path': model_path,
-                'input_file': audio_file_path
-            }
-        }
-        
-        logger.error(f"CNN analysis failed: {e}")
-        logger.error(traceback.format_exc())
-        return json.dumps(error_result)
+        logger.exception("CNN analysis failed: %s", e)
+        return _dumps(_error_result(str(e), model_path, audio_file_path)).decode()
 
 def main():
     
     import argparse
     
+    logging.basicConfig(level=logging.INFO)
+    
     try:
         parser = argparse.ArgumentParser(description='Run CNN analysis on audio file')
         parser.add_argument('audio_file', help='Path to audio file')
@@ -467,8 +612,7 @@ def main():
         logger.warning("\nProcess interrupted by user")
         return 130
     except Exception as e:
-        logger.error(f"Fatal error in main: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Fatal error in main: %s", e)
         return 1
 
 if __name__ == "__main__":
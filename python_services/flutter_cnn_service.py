@@ -2,24 +2,36 @@
 import os
 import sys
 import json
+import importlib.util
+import functools
 import subprocess
 import tempfile
 import logging
 from typing import Dict, List, Optional
 from pathlib import Path
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+_HERE = Path(__file__).resolve().parent
 
-try:
-    from pytorch_cnn_service import PyTorchCNNService
-    PYTORCH_AVAILABLE = True
-except ImportError:
-    PYTORCH_AVAILABLE = False
-    logger = logging.getLogger(__name__)
+sys.path.insert(0, str(_HERE))
+
+PYTORCH_AVAILABLE = importlib.util.find_spec('pytorch_cnn_service') is not None
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_PYTORCH_MODEL_NAME = 'best_repetitions_fluent_logmel_cnn.pt'
+_PYTORCH_MODEL_PATHS = (_HERE / 'models' / _PYTORCH_MODEL_NAME, _HERE / _PYTORCH_MODEL_NAME)
+
+@functools.lru_cache(maxsize=1)
+def _find_pytorch_model() -> Optional[str]:
+
+    for path in _PYTORCH_MODEL_PATHS:
+        if os.path.exists(path):
+            logger.info("✅ Found PyTorch model: %s", _PYTORCH_MODEL_NAME)
+            return str(path)
+    
+    logger.warning("⚠️ No PyTorch model found: best_repetitions_fluent_logmel_cnn.pt")
+    return None
+
 class FlutterCNNService:
     
     def __init__(self):
@@ -30,7 +42,12 @@ class FlutterCNNService:
         if not PYTORCH_AVAILABLE:
             raise RuntimeError("PyTorch is not available. The app requires PyTorch to run the 71% accuracy model.")
         
-        pytorch_model = self._find_pytorch_model()
+        try:
+            from pytorch_cnn_service import PyTorchCNNService
+        except ImportError as e:
+            raise RuntimeError(f"PyTorch is not available. The app requires PyTorch to run the 71% accuracy model. ({e})")
+        
+        pytorch_model = _find_pytorch_model()
         if not pytorch_model:
             raise FileNotFoundError(
                 "Required PyTorch model 'best_repetitions_fluent_logmel_cnn.pt' not found. "
@@ -46,26 +63,10 @@ class FlutterCNNService:
             if 'repetitions_fluent' in model_name:
                 logger.info("✅ Using PyTorch 2-class model (repetitions vs fluent) - 71% accuracy")
             else:
-                logger.warning(f"⚠️ Using PyTorch model: {model_name} (expected repetitions_fluent model)")
+                logger.warning("⚠️ Using PyTorch model: %s (expected repetitions_fluent model)", model_name)
         except Exception as e:
             raise RuntimeError(f"Failed to initialize PyTorch CNN service: {e}. The 71% accuracy model is required.")
         
-    def _find_pytorch_model(self) -> Optional[str]:
-
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), 'models', 'best_repetitions_fluent_logmel_cnn.pt'),
-            os.path.join(os.path.dirname(__file__), 'best_repetitions_fluent_logmel_cnn.pt'),
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                model_name = os.path.basename(path)
-                logger.info(f"✅ Found PyTorch model: {model_name}")
-                return path
-        
-        logger.warning("⚠️ No PyTorch model found: best_repetitions_fluent_logmel_cnn.pt")
-        return None
-        
     def analyze_audio(self, audio_file_path: str) -> Dict[str, any]:
 
         if not os.path.exists(audio_file_path):
@@ -99,14 +100,12 @@ class FlutterCNNService:
             }
         
         try:
-            logger.info(f"🎯 Starting PyTorch CNN analysis for: {audio_file_path}")
+            logger.info("🎯 Starting PyTorch CNN analysis for: %s", audio_file_path)
             results = self.pytorch_service.analyze_audio(audio_file_path)
-            logger.info(f"✅ PyTorch CNN analysis complete. Found {len(results.get('events', []))} events.")
+            logger.info("✅ PyTorch CNN analysis complete. Found %s events.", len(results.get('events', [])))
             return results
         except Exception as e:
-            logger.error(f"❌ PyTorch CNN analysis failed: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("❌ PyTorch CNN analysis failed: %s", e)
             return {
                 'events': [],
                 'summary': {
@@ -124,6 +123,8 @@ class FlutterCNNService:
 def main():
     import argparse
     
+    logging.basicConfig(level=logging.INFO)
+    
     parser = argparse.ArgumentParser(description='Run CNN analysis for Flutter app')
     parser.add_argument('audio_file', help='Path to audio file')
     parser.add_argument('--output', help='Output JSON file path')
@@ -136,7 +137,7 @@ def main():
     if args.output:
         with open(args.output, 'w') as f:
             json.dump(results, f, indent=2)
-        logger.info(f"Results saved to: {args.output}")
+        logger.info("Results saved to: %s", args.output)
     
     print(json.dumps(results))
 